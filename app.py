@@ -2,69 +2,42 @@
 import gradio as gr
 import os
 import sys
-from src.dialogue_engine import PodcastScriptGenerator
+import time
+from datetime import datetime
+from src.dialogue_engine import DEFAULT_SCENARIOS, PodcastScriptGenerator, PromptTemplate
 from src.audio_engine import AudioGenerator
+from src.duration_model import DurationModel, format_seconds
+from src.history import HistoryStore
+from src.voice_registry import VoiceRegistry, is_valid_name
 
 class Preset:
-    def __init__(self):
+    def __init__(self, voice_registry=None):
         """初始化预设的角色和场景选项"""
-        self.character = {
-            "小付": {
-                "gender": "女",
-                "identity": "专业播客主持人",
-                "personality": "亲和力强，善于引导话题，语言表达清晰",
-                "voice_style": "吐字清晰、标准，适合知识传播",
-            },
-            "小陈": {
-                "gender": "男",
-                "identity": "计算机技术专家",
-                "personality": "善于化繁为简，讲解细致，乐于授业",
-                "voice_style": "语速平稳、表达精准，适合技术讲解"
-            },
-            "Mike": {
-                "gender": "男",
-                "identity": "学者",
-                "personality": "学识广博，叙事生动，富有学养",
-                "voice_style": "语调温和亲切，娓娓道来，富有故事感"
-            },
-            "Lily": {
-                "gender": "女",
-                "identity": "医生",
-                "personality": "专业权威，严谨负责，心系大众健康",
-                "voice_style": "语气温柔，语调稳定，给人以信赖感"
-            },
-            "Helen": {
-                "gender": "女",
-                "identity": "生活方式分享者",
-                "personality": "极富亲和力，贴近日常，共情力强",
-                "voice_style": "声音活泼生动，富有朝气与感染力"
-            },
-        }
-
-        self.scenario = {
-            "深度访谈": [
-                "开场要有力，能吸引听众",
-                "问题要由浅入深”",
-                "嘉宾的回答要专业、有洞见",
-                "结尾要自然，并引导听众思考"], # 角色为主持人和任意其他一人
-            "圆桌讨论": [
-                "主持人需要平衡参与者的发言",
-                "每位参与者需从自己的专业角度提出至少两个核心观点",
-                "参与者之间要有观点的互动和碰撞，而不仅仅是回答主持人","语言风格轻松、口语化"], # 角色为主持人和两位或以上其他人
-            "辩论对话": [
-                "结构清晰，包含立论、自由辩论和总结陈词环节",
-                "正反方观点要鲜明，论据要充分，有数据或案例支撑",
-                "辩论要有来有回，针对性强，但保持基本礼貌",
-                "主持人需控制节奏，确保辩论有序进行。"],# 角色为主持人和两位观点不同的其他两人
-            "故事叙述": [
-                "故事结构完整，有开端、发展、高潮和结局",
-                "描述要细致，营造出神秘、宁静又略带紧张的氛围。",
-                "使用丰富的感官描写（如：旧书的气味、脚步的回声、昏暗的灯光）",
-                "在关键情节处设置悬念"] # 角色为主持人和其他一人
-        }
+        self.voice_registry = voice_registry or VoiceRegistry()
+        self.character = self.voice_registry.personas()
+
+        self.scenario = DEFAULT_SCENARIOS
+
+def remove_audio_file(audio_path, audio_dir):
+    """删除不再被历史记录引用的音频文件，只处理 audio_dir 下自动生成的文件"""
+    if not audio_path or not os.path.exists(audio_path):
+        return
+    audio_dir = os.path.realpath(audio_dir)
+    if os.path.commonpath([os.path.realpath(audio_path), audio_dir]) != audio_dir:
+        return
+    try:
+        os.remove(audio_path)
+    except OSError as e:
+        print(f"删除音频文件 {audio_path} 时出错: {e}")
 
 def create_interface():
     preset = Preset()
+    # 启动时预编译提示词模板，注册新角色后重新编译
+    prompt_template = PromptTemplate(preset.character, preset.scenario)
+    duration_model = DurationModel()
+    history = HistoryStore()
+    audio_dir = os.path.join("data", "audio")
+    history_page_size = 10
     
     custom_css = """
     .main-container {
@@ -252,6 +225,16 @@ def create_interface():
                         container=True
                     )
 
+                    duration_slider = gr.Slider(
+                        minimum=3,
+                        maximum=30,
+                        value=5,
+                        step=1,
+                        label="目标时长（分钟）",
+                        container=True,
+                        info="根据各角色音色的语速换算为脚本字数，引导生成对应篇幅"
+                    )
+
                     generate_btn = gr.Button(
                         "生成播客",
                         variant="primary",
@@ -279,6 +262,12 @@ def create_interface():
                         container=True
                     )
 
+                    audio_output = gr.Audio(
+                        label="播客音频",
+                        type="filepath",
+                        interactive=False
+                    )
+
 
         # 特色功能展示
         features_section = gr.HTML("""
@@ -301,11 +290,43 @@ def create_interface():
         </div>
         """)
 
+        # 自定义角色（折叠面板）
+        with gr.Accordion("自定义角色", open=False) as custom_accordion:
+            custom_name = gr.Textbox(label="角色名")
+            with gr.Row():
+                custom_gender = gr.Dropdown(choices=["女", "男"], label="性别", value="女")
+                custom_identity = gr.Textbox(label="身份")
+            custom_personality = gr.Textbox(label="性格")
+            custom_voice_style = gr.Textbox(label="音色风格")
+            # 使用 gr.File 而不是 gr.Audio：部分 Gradio 版本会对上传的音频重新编码，
+            # 导致哈希与样本地址上的原始文件不一致
+            custom_sample = gr.File(
+                label="音色样本（用于零样本克隆）",
+                file_types=["audio"],
+                type="filepath"
+            )
+            custom_sample_url = gr.Textbox(
+                label="样本公网地址",
+                info="必填。克隆服务需要通过 URL 获取音频，地址内容须与上传的样本相同；相同样本只会克隆一次"
+            )
+            custom_btn = gr.Button("注册角色", variant="secondary")
+            custom_status = gr.Markdown("")
+
         # 历史记录和设置（折叠面板）
         with gr.Accordion("生成历史", open=False) as history_accordion:
             history_title = gr.Markdown("### 生成历史")
+            with gr.Row():
+                history_query = gr.Textbox(label="搜索主题或脚本", scale=3)
+                history_page = gr.Number(label="页码", value=1, minimum=1, precision=0, scale=1)
             history_output = gr.Markdown("暂无生成历史")
             refresh_history_btn = gr.Button("刷新历史", variant="secondary")
+            with gr.Row():
+                history_job_id = gr.Number(label="记录编号", precision=0, scale=2)
+                replay_btn = gr.Button("回放", variant="secondary", scale=1)
+                rerender_btn = gr.Button("重新合成音频", variant="secondary", scale=1)
+                delete_btn = gr.Button("删除记录", variant="stop", scale=1)
+            history_audio = gr.Audio(label="历史音频", type="filepath", interactive=False)
+            history_script = gr.Textbox(label="历史脚本", lines=10, max_lines=20)
 
         # 更新角色信息的函数
         def update_character_info(selected_characters):
@@ -355,18 +376,57 @@ def create_interface():
             outputs=scenario_info
         )
 
+        # 注册自定义角色的函数
+        def register_custom_character(name, gender, identity, personality, voice_style, sample_path, sample_url):
+            name = (name or "").strip()
+            if not name:
+                return gr.update(), "请输入角色名"
+            if not is_valid_name(name):
+                return gr.update(), "角色名只能包含字母、数字、下划线或汉字（不能有空格、点号或连字符）"
+            if not sample_path:
+                return gr.update(), "请上传音色样本"
+            sample_url = (sample_url or "").strip()
+            if not sample_url:
+                return gr.update(), "请填写样本公网地址"
+            persona = {
+                "gender": gender,
+                "identity": identity,
+                "personality": personality,
+                "voice_style": voice_style,
+            }
+            try:
+                voice_id = preset.voice_registry.register_cloned(
+                    name, persona, sample_path, sample_url
+                )
+            except Exception as e:
+                return gr.update(), f"注册失败：{str(e)}"
+            nonlocal prompt_template
+            preset.character = preset.voice_registry.personas()
+            prompt_template = PromptTemplate(preset.character, preset.scenario)
+            return gr.update(choices=list(preset.character.keys())), f"角色 **{name}** 注册成功，音色：{voice_id}"
+
+        custom_btn.click(
+            fn=register_custom_character,
+            inputs=[custom_name, custom_gender, custom_identity, custom_personality,
+                    custom_voice_style, custom_sample, custom_sample_url],
+            outputs=[character_checkbox, custom_status]
+        )
+
         # 生成播客的主函数
-        def generate_podcast(topic, selected_characters, scenario):
-            """生成播客脚本和音频信息"""
+        def generate_podcast(topic, selected_characters, scenario, target_minutes):
+            """生成播客脚本和音频信息，各阶段完成后依次更新界面"""
             # 验证输入
             if not topic.strip():
-                return "请输入播客主题或文本内容", "请先输入主题或文本内容"
+                yield "请输入播客主题或文本内容", "请先输入主题或文本内容", None
+                return
 
             if not selected_characters:
-                return "请至少选择一个角色类型", "请先选择角色"
+                yield "请至少选择一个角色类型", "请先选择角色", None
+                return
 
             if not scenario:
-                return "请选择一个场景模式", "请先选择场景"
+                yield "请选择一个场景模式", "请先选择场景", None
+                return
 
             # 准备角色信息
             characters_data = {}
@@ -374,31 +434,183 @@ def create_interface():
                 if char_name in preset.character:
                     characters_data[char_name] = preset.character[char_name]
 
+            voice_map = preset.voice_registry.voice_map()
+            voices = [voice_map[c] for c in characters_data if c in voice_map]
+            target_chars = duration_model.target_chars(target_minutes, voices)
+
+            # 调用 LLM 之前，先根据输入内容给出粗略估计
+            input_duration = duration_model.estimate_text(topic, voices)
+            yield "", (f"正在生成脚本...\n"
+                       f"输入内容朗读约 {format_seconds(input_duration)}，"
+                       f"目标时长 {target_minutes} 分钟（约 {target_chars} 字）"), None
+
             try:
                 # 生成脚本
+                script_start = time.perf_counter()
                 script_generator = PodcastScriptGenerator(
                     topic=topic.strip(),
                     characters=characters_data,
                     scenario={scenario: preset.scenario[scenario]},
+                    target_minutes=target_minutes,
+                    target_chars=target_chars,
+                    template=prompt_template,
                 )
                 script = script_generator.generate_script()
-
-                # 创建音频生成器实例
-                audioGenerator = AudioGenerator()
-                output_file = audioGenerator.batch_generate_audio(script, "test_podcast.mp3")
+                script_seconds = time.perf_counter() - script_start
+
+                # 根据脚本预测音频时长、合成耗时以及所需并发数
+                estimate = duration_model.estimate_script(script, voice_map)
+                if not estimate["segment_latencies"]:
+                    raise ValueError("生成的脚本中没有可合成的 <角色名>对话</角色名> 段落")
+                workers = duration_model.suggest_workers(estimate["segment_latencies"])
+                eta = duration_model.estimate_eta(estimate["segment_latencies"], workers)
+                estimate_text = (f"预计时长: {format_seconds(estimate['duration'])}，"
+                                 f"预计合成耗时: {format_seconds(eta)}（并发数 {workers}）")
+                yield script, f"脚本生成完成，正在合成音频...\n{estimate_text}", None
+
+                # 创建音频生成器实例，每次生成写入独立的文件，便于历史回放
+                os.makedirs(audio_dir, exist_ok=True)
+                output_file = os.path.join(audio_dir, f"podcast_{datetime.now():%Y%m%d_%H%M%S_%f}.mp3")
+                audio_start = time.perf_counter()
+                audioGenerator = AudioGenerator(duration_model=duration_model, voice_registry=preset.voice_registry)
+                output_file = audioGenerator.batch_generate_audio(script, output_file, workers=workers)
+                synthesis_seconds = time.perf_counter() - audio_start
                 print(f"音频生成完成: {output_file}")
 
-                return script, audio_status
+                cast = {name: dict(data, voice=voice_map.get(name)) for name, data in characters_data.items()}
+                job_id = history.add_job(
+                    topic=topic.strip(),
+                    script=script,
+                    characters=cast,
+                    scenario=scenario,
+                    audio_path=output_file,
+                    target_minutes=target_minutes,
+                    script_seconds=script_seconds,
+                    synthesis_seconds=synthesis_seconds,
+                    duration=audioGenerator.last_duration,
+                )
+
+                status = (f"音频生成完成: {output_file}（记录编号 {job_id}）\n"
+                          f"实际时长: {format_seconds(audioGenerator.last_duration)}，"
+                          f"实际合成耗时: {format_seconds(synthesis_seconds)}")
+                yield script, status, output_file
 
             except Exception as e:
                 error_msg = f"生成失败：{str(e)}"
-                return error_msg, error_msg
+                yield error_msg, error_msg, None
 
         # 绑定生成按钮的点击事件
         generate_btn.click(
             fn=generate_podcast,
-            inputs=[topic_input, character_checkbox, scenario_dropdown],
-            outputs=[script_output, audio_status]
+            inputs=[topic_input, character_checkbox, scenario_dropdown, duration_slider],
+            outputs=[script_output, audio_status, audio_output]
+        )
+
+        # 查询生成历史的函数
+        def show_history(query, page):
+            page = int(page or 1)
+            jobs, total = history.search(query, page=page, page_size=history_page_size)
+            if not jobs:
+                return "暂无生成历史" if not total else f"第 {page} 页没有记录（共 {total} 条）"
+
+            pages = (total + history_page_size - 1) // history_page_size
+            info_text = f"共 {total} 条记录，第 {page}/{pages} 页\n\n"
+            for job in jobs:
+                created = datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M")
+                topic = job["topic"].replace("\n", " ")
+                if len(topic) > 40:
+                    topic = topic[:40] + "..."
+                duration = format_seconds(job["duration"]) if job["duration"] else "未知"
+                info_text += (f"- **#{job['id']}** {created} | {job['scenario']} | "
+                              f"{'、'.join(job['characters'])} | 时长 {duration}\n  {topic}\n")
+            return info_text
+
+        # 回放历史记录的函数
+        def replay_job(job_id):
+            if not job_id:
+                return None, "请输入记录编号"
+            job = history.get(int(job_id))
+            if not job:
+                return None, f"记录 {int(job_id)} 不存在"
+            audio_path = job["audio_path"]
+            if not audio_path or not os.path.exists(audio_path):
+                return None, job["script"]
+            return audio_path, job["script"]
+
+        # 使用历史脚本重新合成音频，无需再次调用 LLM
+        def rerender_job(job_id):
+            if not job_id:
+                return None, "请输入记录编号"
+            job = history.get(int(job_id))
+            if not job:
+                return None, f"记录 {int(job_id)} 不存在"
+            try:
+                os.makedirs(audio_dir, exist_ok=True)
+                output_file = os.path.join(audio_dir, f"podcast_{datetime.now():%Y%m%d_%H%M%S_%f}.mp3")
+                audio_start = time.perf_counter()
+                # 优先使用记录中保存的音色，保证重新合成的结果与原节目一致；
+                # 记录中缺少音色的角色才从当前注册表查找
+                voice_map = preset.voice_registry.voice_map()
+                voice_map.update({name: data["voice"] for name, data in job["characters"].items()
+                                  if data.get("voice")})
+                estimate = duration_model.estimate_script(job["script"], voice_map)
+                workers = duration_model.suggest_workers(estimate["segment_latencies"])
+                audioGenerator = AudioGenerator(duration_model=duration_model, voice_registry=preset.voice_registry)
+                output_file = audioGenerator.batch_generate_audio(job["script"], output_file, workers=workers,
+                                                                  voice_map=voice_map)
+                history.update_audio(job["id"], output_file, time.perf_counter() - audio_start,
+                                     audioGenerator.last_duration)
+                # 每条记录只保留最新的音频
+                remove_audio_file(job["audio_path"], audio_dir)
+                return output_file, job["script"]
+            except Exception as e:
+                return None, f"重新合成失败：{str(e)}"
+
+        # 删除历史记录及其音频文件
+        def delete_job(job_id, query, page):
+            if not job_id:
+                return show_history(query, page), None, "请输入记录编号"
+            job = history.get(int(job_id))
+            if not job:
+                return show_history(query, page), None, f"记录 {int(job_id)} 不存在"
+            history.delete(job["id"])
+            remove_audio_file(job["audio_path"], audio_dir)
+            return show_history(query, page), None, f"记录 {job['id']} 已删除"
+
+        refresh_history_btn.click(
+            fn=show_history,
+            inputs=[history_query, history_page],
+            outputs=history_output
+        )
+
+        app.load(
+            fn=show_history,
+            inputs=[history_query, history_page],
+            outputs=history_output
+        )
+
+        history_query.submit(
+            fn=show_history,
+            inputs=[history_query, history_page],
+            outputs=history_output
+        )
+
+        replay_btn.click(
+            fn=replay_job,
+            inputs=history_job_id,
+            outputs=[history_audio, history_script]
+        )
+
+        rerender_btn.click(
+            fn=rerender_job,
+            inputs=history_job_id,
+            outputs=[history_audio, history_script]
+        )
+
+        delete_btn.click(
+            fn=delete_job,
+            inputs=[history_job_id, history_query, history_page],
+            outputs=[history_output, history_audio, history_script]
         )
 
     return app
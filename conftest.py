@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+# 放在仓库根目录，使 pytest 将根目录加入 sys.path，测试中可以直接 import src.*
@@ -1,19 +1,41 @@
-import dashscope
-from dashscope.audio.tts_v2 import *
+import io
 import re
 import os
-from pydub import AudioSegment
-# 若没有将API Key配置到环境变量中，需将your-api-key替换为自己的API Key
-dashscope.api_key = "sk-07814aca07584d118f214fcff042ed31"
-CharactertoVoice = {
-    "小付": "longanwen",
-    "小陈": "longanshuo",
-    "Mike": "longanzhi",
-    "Lily": "longanrou",
-    "Helen": "longhua_v2"
-}
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.duration_model import DurationModel
+from src.voice_registry import DEFAULT_PERSONAS, VoiceRegistry
+# 若没有将API Key配置到环境变量 DASHSCOPE_API_KEY 中，将使用此处的默认值
+DASHSCOPE_API_KEY = os.getenv("DASHSCOPE_API_KEY", "sk-07814aca07584d118f214fcff042ed31")
+# 预设角色的音色映射，自定义角色和克隆音色见 VoiceRegistry
+CharactertoVoice = {name: persona["voice"] for name, persona in DEFAULT_PERSONAS.items()}
+
+
+def _load_dashscope():
+    """首次合成时才导入 dashscope 并设置 API Key，避免导入本模块时加载语音合成后端"""
+    import dashscope
+
+    if not dashscope.api_key:
+        dashscope.api_key = DASHSCOPE_API_KEY
+    return dashscope
+
+
 class AudioGenerator:
+    def __init__(self, duration_model=None, voice_registry=None):
+        """
+        参数:
+        duration_model (DurationModel): 用于记录每次合成的时长和耗时，为 None 时使用默认模型
+        voice_registry (VoiceRegistry): 角色到音色的注册表，为 None 时使用默认注册表
+        """
+        self.duration_model = duration_model or DurationModel()
+        self.voice_registry = voice_registry or VoiceRegistry()
+        # 最近一次合成的音频时长（秒）
+        self.last_duration = None
+
     def _generate_audio(self, script_text, voice="longxiaochun_v2"):
+        _load_dashscope()
+        from dashscope.audio.tts_v2 import SpeechSynthesizer
+
         # 实例化SpeechSynthesizer，并在构造方法中传入模型（model）、音色（voice）等请求参数
         synthesizer = SpeechSynthesizer(model="cosyvoice-v2", voice=voice)
         # 发送待合成文本，获取二进制音频
@@ -46,13 +68,52 @@ class AudioGenerator:
 
         return segments
 
-    def batch_generate_audio(self, script_text, output_file="podcast_output.mp3"):
+    def _synthesize_segment(self, index, character, content, voice_map=None):
+        """
+        合成单段对话并记录时长和耗时
+
+        参数:
+        voice_map (dict): 优先使用的角色到音色映射，未包含的角色从注册表查找
+
+        返回:
+        AudioSegment: 该段音频，角色无对应音色或合成失败时返回 None
+        """
+        from pydub import AudioSegment
+
+        # 获取角色对应的音色
+        voice = (voice_map or {}).get(character) or self.voice_registry.voice_for(character)
+        if not voice:
+            print(f"警告: 角色 '{character}' 未找到对应音色，跳过此段")
+            return None
+
+        print(f"正在生成第 {index+1} 段音频 - 角色: {character}, 音色: {voice}")
+        print(f"内容: {content[:50]}...")  # 显示前50个字符
+
+        try:
+            start_time = time.perf_counter()
+            audio_data = self._generate_audio(content, voice)
+            latency = time.perf_counter() - start_time
+
+            # 直接从内存加载音频段，并发合成时无需共享临时文件
+            audio_segment = AudioSegment.from_file(io.BytesIO(audio_data), format="mp3")
+            self.duration_model.record(voice, content, audio_segment.duration_seconds, latency)
+
+            print(f"第 {index+1} 段音频生成完成")
+            return audio_segment
+
+        except Exception as e:
+            print(f"生成第 {index+1} 段音频时出错: {e}")
+            return None
+
+    def batch_generate_audio(self, script_text, output_file="podcast_output.mp3", workers=1, voice_map=None):
         """
         批量生成音频，根据脚本中每个角色使用对应的音色，并合并成完整音频
 
         参数:
         script_text (str): 格式为 <角色名>对话内容</角色名> 的脚本文本
         output_file (str): 输出的音频文件名
+        workers (int): 并发合成的段数，可由 DurationModel.suggest_workers 估算
+        voice_map (dict): 优先使用的角色到音色映射（如历史记录中保存的音色），未包含的角色从注册表查找
 
         返回:
         str: 生成的音频文件路径
@@ -63,69 +124,38 @@ class AudioGenerator:
         if not segments:
             raise ValueError("未能从脚本中提取到有效的对话内容")
 
-        print(f"解析到 {len(segments)} 段对话")
+        print(f"解析到 {len(segments)} 段对话，并发数 {workers}")
+
+        # 为每段对话生成音频，结果按原顺序排列
+        workers = max(1, int(workers))
+        if workers == 1:
+            results = [self._synthesize_segment(i, c, t, voice_map) for i, (c, t) in enumerate(segments)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    lambda item: self._synthesize_segment(item[0], *item[1], voice_map), enumerate(segments)
+                ))
+        audio_segments = [segment for segment in results if segment is not None]
 
-        # 存储所有音频段
-        audio_segments = []
+        if not audio_segments:
+            raise RuntimeError("没有成功生成任何音频段")
 
-        # 临时文件列表
-        temp_files = []
+        # 合并所有音频段
+        print("正在合并音频...")
+        final_audio = sum(audio_segments)
+
+        # 导出最终音频
+        final_audio.export(output_file, format="mp3")
+        self.last_duration = final_audio.duration_seconds
+        print(f"完整音频已保存到: {output_file}")
 
         try:
-            # 为每段对话生成音频
-            for i, (character, content) in enumerate(segments):
-                # 获取角色对应的音色
-                voice = CharactertoVoice.get(character)
-                if not voice:
-                    print(f"警告: 角色 '{character}' 未找到对应音色，跳过此段")
-                    continue
-
-                print(f"正在生成第 {i+1} 段音频 - 角色: {character}, 音色: {voice}")
-                print(f"内容: {content[:50]}...")  # 显示前50个字符
-
-                # 生成音频
-                try:
-                    audio_data = self._generate_audio(content, voice)
-
-                    # 保存临时音频文件
-                    temp_file = f"temp_audio_{i}.mp3"
-                    with open(temp_file, 'wb') as f:
-                        f.write(audio_data)
-
-                    temp_files.append(temp_file)
-
-                    # 加载音频段
-                    audio_segment = AudioSegment.from_mp3(temp_file)
-                    audio_segments.append(audio_segment)
-
-                    print(f"第 {i+1} 段音频生成完成")
-
-                except Exception as e:
-                    print(f"生成第 {i+1} 段音频时出错: {e}")
-                    continue
-
-            if not audio_segments:
-                raise RuntimeError("没有成功生成任何音频段")
-
-            # 合并所有音频段
-            print("正在合并音频...")
-            final_audio = sum(audio_segments)
-
-            # 导出最终音频
-            final_audio.export(output_file, format="mp3")
-            print(f"完整音频已保存到: {output_file}")
-
-            return output_file
-
-        finally:
-            # 清理临时文件
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                except Exception as e:
-                    print(f"清理临时文件 {temp_file} 时出错: {e}")
-        
+            self.duration_model.save()
+        except OSError as e:
+            print(f"保存时长统计时出错: {e}")
+
+        return output_file
+
 
 if __name__ == "__main__":
     # 测试批量生成音频功能
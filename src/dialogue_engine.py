@@ -1,41 +1,37 @@
-import os
-from openai import OpenAI
 import json
+import threading
 
-class PodcastScriptGenerator:
-    def __init__(self, topic, characters={
-                "小付": {
-                    "gender": "女",
-                    "identity": "专业播客主持人",
-                    "personality": "亲和力强，善于引导话题，语言表达清晰",
-                    "voice_style": "吐字清晰、标准，适合知识传播"
-                },
-                "小陈": {
-                    "gender": "男",
-                    "identity": "计算机技术专家",
-                    "personality": "善于化繁为简，讲解细致，乐于授业",
-                    "voice_style": "语速平稳、表达精准，适合技术讲解"
-            }
-            }, scenario={
-                "深度访谈": [
-                    "开场要有力，能吸引听众",
-                    "问题要由浅入深”",
-                    "嘉宾的回答要专业、有洞见",
-                    "结尾要自然，并引导听众思考"]
-            }):
-        self.client = OpenAI(
-        api_key="c1bff111ac2467e326e4103351f1975127e96e29",
-        base_url="https://aistudio.baidu.com/llm/lmapi/v3",
-        )
-        # self.client = OpenAI(
-        # api_key="sk-GNj6ikI0K6hwqJPZoO5DJjsrWo3RJAkRfKkLquRWzLCFzZIr",
-        # base_url="https://api.hunyuan.cloud.tencent.com/v1",
-        # )
-        self.topic = topic
-        system_template = """<instructions>根据用户输入，生成内容有深度的播客脚本</instructions>
-<characters>{characters}</characters>
-<scenario>{scenario}</scenario>
-<format>
+# 预设场景：场景名 -> 对话要求
+DEFAULT_SCENARIOS = {
+    "深度访谈": [
+        "开场要有力，能吸引听众",
+        "问题要由浅入深”",
+        "嘉宾的回答要专业、有洞见",
+        "结尾要自然，并引导听众思考"], # 角色为主持人和任意其他一人
+    "圆桌讨论": [
+        "主持人需要平衡参与者的发言",
+        "每位参与者需从自己的专业角度提出至少两个核心观点",
+        "参与者之间要有观点的互动和碰撞，而不仅仅是回答主持人","语言风格轻松、口语化"], # 角色为主持人和两位或以上其他人
+    "辩论对话": [
+        "结构清晰，包含立论、自由辩论和总结陈词环节",
+        "正反方观点要鲜明，论据要充分，有数据或案例支撑",
+        "辩论要有来有回，针对性强，但保持基本礼貌",
+        "主持人需控制节奏，确保辩论有序进行。"],# 角色为主持人和两位观点不同的其他两人
+    "故事叙述": [
+        "故事结构完整，有开端、发展、高潮和结局",
+        "描述要细致，营造出神秘、宁静又略带紧张的氛围。",
+        "使用丰富的感官描写（如：旧书的气味、脚步的回声、昏暗的灯光）",
+        "在关键情节处设置悬念"] # 角色为主持人和其他一人
+}
+
+_EXAMPLE = """<小付>大家好，欢迎收听本期的"科技前沿"播客！我是主持人小付。今天我们有幸邀请到了计算机技术专家小陈，他将和我们深入聊聊"云原生"这个热门话题。小陈，欢迎来到节目！</小付>
+<小陈>谢谢小付！很高兴来到这里，和听众们分享云原生的那些事儿。</小陈>"""
+
+# 示例在模块加载时填入，请求时只需替换角色、场景和篇幅
+_SYSTEM_TEMPLATE = """<instructions>根据用户输入，生成内容有深度的播客脚本</instructions>
+<characters>{{characters}}</characters>
+<scenario>{{scenario}}</scenario>
+{{length}}<format>
 【最严格格式要求】每段对话必须严格遵循以下XML格式：
 - 必须以"<角色名>"开始
 - 必须以"</角色名>"结束
@@ -54,6 +50,7 @@ class PodcastScriptGenerator:
 2. 高度契合<characters>中的角色人设
 3. 高度契合<scenario>定义的场景
 4. 【最高优先级】每段对话都必须以<角色名>开始，以</角色名>结束，不得遗漏结束标签
+5. 对话篇幅符合<length>的要求（如有）
 </constraints>
 <examples>
 {example}
@@ -63,20 +60,129 @@ class PodcastScriptGenerator:
 2. 探索主题: 概述输入内容中的主要点，以在对话中覆盖，确保全面覆盖
 3. 生成对话: 严格遵守<constraints>
 4. 审核对话: 仔细审查生成的对话，确保其遵守<constraints>
-</exact steps>"""
+</exact steps>""".format(example=_EXAMPLE)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """按需创建并复用 OpenAI 客户端，避免导入时加载 openai 以及每次请求重建连接池"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+
+                _client = OpenAI(
+                    api_key="c1bff111ac2467e326e4103351f1975127e96e29",
+                    base_url="https://aistudio.baidu.com/llm/lmapi/v3",
+                )
+                # _client = OpenAI(
+                # api_key="sk-GNj6ikI0K6hwqJPZoO5DJjsrWo3RJAkRfKkLquRWzLCFzZIr",
+                # base_url="https://api.hunyuan.cloud.tencent.com/v1",
+                # )
+    return _client
+
+
+def _json_fragment(key, value):
+    """序列化单个键值对，结果可直接拼接成与 json.dumps(dict, indent=2) 相同的文本"""
+    return json.dumps({key: value}, indent=2, ensure_ascii=False)[2:-2]
+
+
+class PromptTemplate:
+    def __init__(self, characters, scenarios=DEFAULT_SCENARIOS):
+        """
+        预编译系统提示词：启动时把每个角色人设和场景各序列化一次，请求时只做字符串拼接
+
+        参数:
+        characters (dict): 角色名到人设的映射
+        scenarios (dict): 场景名到对话要求的映射
+        """
+        self._characters = {name: (persona, _json_fragment(name, persona)) for name, persona in characters.items()}
+        self._scenarios = {name: (rules, _json_fragment(name, rules)) for name, rules in scenarios.items()}
+
+    @staticmethod
+    def _join(fragments, items):
+        parts = []
+        for name, value in items.items():
+            cached = fragments.get(name)
+            # 未预编译或内容已变化（如新注册的自定义角色）时现场序列化
+            parts.append(cached[1] if cached and cached[0] == value else _json_fragment(name, value))
+        return "{\n" + ",\n".join(parts) + "\n}" if parts else "{}"
+
+    def render(self, characters, scenario, target_minutes=None, target_chars=None):
+        """
+        生成系统提示词
+
+        参数:
+        characters (dict): 本次参与的角色名到人设的映射
+        scenario (dict): 本次的场景名到对话要求的映射
+        target_minutes (float): 目标时长（分钟）
+        target_chars (int): 目标时长对应的脚本字数
+
+        返回:
+        str: 系统提示词
+        """
+        length = ""
+        if target_minutes:
+            length = f"<length>播客时长约{target_minutes}分钟"
+            if target_chars:
+                length += f"，所有对话内容合计约{target_chars}字"
+            length += "</length>\n"
+        return _SYSTEM_TEMPLATE.format(
+            characters=self._join(self._characters, characters),
+            scenario=self._join(self._scenarios, scenario),
+            length=length,
+        )
+
+
+_DEFAULT_TEMPLATE = PromptTemplate({})
+
+
+class PodcastScriptGenerator:
+    def __init__(self, topic, characters={
+                "小付": {
+                    "gender": "女",
+                    "identity": "专业播客主持人",
+                    "personality": "亲和力强，善于引导话题，语言表达清晰",
+                    "voice_style": "吐字清晰、标准，适合知识传播"
+                },
+                "小陈": {
+                    "gender": "男",
+                    "identity": "计算机技术专家",
+                    "personality": "善于化繁为简，讲解细致，乐于授业",
+                    "voice_style": "语速平稳、表达精准，适合技术讲解"
+            }
+            }, scenario={
+                "深度访谈": DEFAULT_SCENARIOS["深度访谈"]
+            }, target_minutes=None, target_chars=None, template=None):
+        """
+        参数:
+        topic (str): 播客主题或文本内容
+        characters (dict): 参与的角色名到人设的映射
+        scenario (dict): 场景名到对话要求的映射
+        target_minutes (float): 目标时长（分钟）
+        target_chars (int): 目标时长对应的脚本字数
+        template (PromptTemplate): 预编译的提示词模板，为 None 时使用只含预设场景的模板
+        """
+        self.topic = topic
+        template = template or _DEFAULT_TEMPLATE
+        self.formatted_system_prompt = template.render(characters, scenario, target_minutes, target_chars)
+
+    @property
+    def client(self):
+        return _get_client()
 
-        example = """<小付>大家好，欢迎收听本期的"科技前沿"播客！我是主持人小付。今天我们有幸邀请到了计算机技术专家小陈，他将和我们深入聊聊"云原生"这个热门话题。小陈，欢迎来到节目！</小付>
-<小陈>谢谢小付！很高兴来到这里，和听众们分享云原生的那些事儿。</小陈>"""
-        formatted_characters = json.dumps(characters, indent=2, ensure_ascii=False)
-        formatted_scenario = json.dumps(scenario, indent=2, ensure_ascii=False)
-        self.formatted_system_prompt = system_template.format(characters=formatted_characters, scenario=formatted_scenario, example=example)
-        print(self.formatted_system_prompt)
     def generate_script(self):
         """
         生成播客脚本
         
         返回:
         str: 生成的播客脚本内容
+
+        异常:
+        RuntimeError: 调用 LLM 失败，或返回内容为空
         """
         # 构建消息
         messages = [
@@ -93,11 +199,12 @@ class PodcastScriptGenerator:
                 stream=False
             )
             raw_content = response.choices[0].message.content
-            print(raw_content)
-            # 后处理：自动补全缺失的结束标签
-            return self._fix_missing_tags(raw_content)
         except Exception as e:
-            return f"API调用错误: {e}"
+            raise RuntimeError(f"API调用错误: {e}") from e
+        if not raw_content or not raw_content.strip():
+            raise RuntimeError("API返回内容为空")
+        # 后处理：自动补全缺失的结束标签
+        return self._fix_missing_tags(raw_content)
 
     def _fix_missing_tags(self, content):
         """
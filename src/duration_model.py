@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""按音色统计的时长模型：字符数 -> 音频时长、字符数 -> 合成耗时"""
+import json
+import os
+import re
+import threading
+
+# 没有历史数据时使用的默认值（中文播客语速约 270 字/分钟）
+DEFAULT_CHARS_PER_SECOND = 4.5
+DEFAULT_LATENCY_OVERHEAD = 0.8  # 每次请求的固定耗时（秒）
+DEFAULT_LATENCY_PER_CHAR = 0.02  # 每个字符的合成耗时（秒）
+# 样本不足时，默认值相当于这么多个样本的权重，避免个别样本把估计拉偏
+PRIOR_SAMPLES = 2
+# 至少有这么多样本时才使用最小二乘拟合
+MIN_FIT_SAMPLES = 3
+
+# 统计字符数时忽略空白和标点，只计算实际会被读出来的字符
+_IGNORED_CHARS = re.compile(r'[\s，。！？、；：“”‘’（）《》【】…—,.!?;:"\'()\[\]<>-]')
+_SEGMENT_PATTERN = re.compile(r'<(\w+)>(.*?)</\1>', re.DOTALL)
+
+
+def count_chars(text):
+    """统计文本中会被朗读的字符数"""
+    return len(_IGNORED_CHARS.sub('', text))
+
+
+class _VoiceStats:
+    """单个音色的累计统计量"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.samples = data.get("samples", 0)
+        self.chars = data.get("chars", 0.0)
+        self.seconds = data.get("seconds", 0.0)
+        # 合成耗时的最小二乘拟合：latency = overhead + per_char * chars
+        self.sum_x = data.get("sum_x", 0.0)
+        self.sum_y = data.get("sum_y", 0.0)
+        self.sum_xx = data.get("sum_xx", 0.0)
+        self.sum_xy = data.get("sum_xy", 0.0)
+
+    def add(self, chars, audio_seconds, latency_seconds):
+        self.samples += 1
+        self.chars += chars
+        self.seconds += audio_seconds
+        self.sum_x += chars
+        self.sum_y += latency_seconds
+        self.sum_xx += chars * chars
+        self.sum_xy += chars * latency_seconds
+
+    def chars_per_second(self):
+        if self.seconds <= 0 or self.chars <= 0:
+            return DEFAULT_CHARS_PER_SECOND
+        return self.chars / self.seconds
+
+    def _scaled_defaults(self):
+        """
+        保持默认的固定耗时/每字耗时比例，按实测总耗时整体缩放，
+        并向默认值收缩（默认值视为 PRIOR_SAMPLES 个样本）
+        """
+        expected = self.samples * DEFAULT_LATENCY_OVERHEAD + self.sum_x * DEFAULT_LATENCY_PER_CHAR
+        scale = self.sum_y / expected if expected > 0 else 1.0
+        scale = (self.samples * scale + PRIOR_SAMPLES) / (self.samples + PRIOR_SAMPLES)
+        return DEFAULT_LATENCY_OVERHEAD * scale, DEFAULT_LATENCY_PER_CHAR * scale
+
+    def latency_coefficients(self):
+        """返回 (overhead, per_char)，样本不足或拟合失败时按实测数据缩放默认值"""
+        if self.samples == 0:
+            return DEFAULT_LATENCY_OVERHEAD, DEFAULT_LATENCY_PER_CHAR
+        denominator = self.samples * self.sum_xx - self.sum_x ** 2
+        if self.samples < MIN_FIT_SAMPLES or denominator <= 0:
+            # 样本太少或字符数都相同时无法区分固定耗时和每字耗时
+            return self._scaled_defaults()
+        per_char = (self.samples * self.sum_xy - self.sum_x * self.sum_y) / denominator
+        overhead = (self.sum_y - per_char * self.sum_x) / self.samples
+        if per_char < 0 or overhead < 0:
+            # 数据噪声导致拟合出负值时同样回退
+            return self._scaled_defaults()
+        return overhead, per_char
+
+    def to_dict(self):
+        return {
+            "samples": self.samples,
+            "chars": self.chars,
+            "seconds": self.seconds,
+            "sum_x": self.sum_x,
+            "sum_y": self.sum_y,
+            "sum_xx": self.sum_xx,
+            "sum_xy": self.sum_xy,
+        }
+
+
+class DurationModel:
+    def __init__(self, stats_file=os.path.join("data", "voice_stats.json")):
+        """
+        初始化时长模型
+
+        参数:
+        stats_file (str): 统计数据的持久化文件路径，为 None 时只保存在内存中
+        """
+        self.stats_file = stats_file
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._load()
+
+    def _load(self):
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._stats = {voice: _VoiceStats(item) for voice, item in data.items()}
+        except (OSError, ValueError) as e:
+            print(f"警告: 读取时长统计 {self.stats_file} 失败，使用默认值: {e}")
+
+    def save(self):
+        """将统计数据写入文件"""
+        if not self.stats_file:
+            return
+        directory = os.path.dirname(self.stats_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 写入和替换都在锁内完成，避免并发任务交错写同一个临时文件
+        with self._lock:
+            data = {voice: stats.to_dict() for voice, stats in self._stats.items()}
+            temp_file = self.stats_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.stats_file)
+
+    def record(self, voice, text, audio_seconds, latency_seconds):
+        """
+        记录一次合成结果
+
+        参数:
+        voice (str): 音色名
+        text (str): 合成的文本
+        audio_seconds (float): 生成音频的时长（秒）
+        latency_seconds (float): 合成请求的耗时（秒）
+        """
+        chars = count_chars(text)
+        if chars <= 0 or audio_seconds <= 0:
+            return
+        with self._lock:
+            self._stats.setdefault(voice, _VoiceStats()).add(chars, audio_seconds, latency_seconds)
+
+    def chars_per_second(self, voice):
+        """音色的语速（字/秒）"""
+        stats = self._stats.get(voice)
+        return stats.chars_per_second() if stats else DEFAULT_CHARS_PER_SECOND
+
+    def _latency(self, voice, chars):
+        stats = self._stats.get(voice)
+        if stats:
+            overhead, per_char = stats.latency_coefficients()
+        else:
+            overhead, per_char = DEFAULT_LATENCY_OVERHEAD, DEFAULT_LATENCY_PER_CHAR
+        return overhead + per_char * chars
+
+    def _average_chars_per_second(self, voices):
+        voices = list(voices)
+        if not voices:
+            return DEFAULT_CHARS_PER_SECOND
+        return sum(self.chars_per_second(v) for v in voices) / len(voices)
+
+    def estimate_segments(self, segments, voice_map):
+        """
+        预测一组对话段的音频时长和合成耗时
+
+        参数:
+        segments (list): (角色名, 对话内容) 元组的列表
+        voice_map (dict): 角色名到音色的映射
+
+        返回:
+        dict: duration（音频总时长，秒）、latency（串行合成总耗时，秒）、
+              segment_latencies（每段合成耗时）
+        """
+        duration = 0.0
+        latencies = []
+        for character, content in segments:
+            voice = voice_map.get(character)
+            if not voice:
+                continue
+            chars = count_chars(content)
+            duration += chars / self.chars_per_second(voice)
+            latencies.append(self._latency(voice, chars))
+        return {
+            "duration": duration,
+            "latency": sum(latencies),
+            "segment_latencies": latencies,
+        }
+
+    def estimate_script(self, script_text, voice_map):
+        """根据 <角色名>内容</角色名> 格式的脚本预测时长和合成耗时"""
+        segments = [(c, t.strip()) for c, t in _SEGMENT_PATTERN.findall(script_text) if t.strip()]
+        return self.estimate_segments(segments, voice_map)
+
+    def estimate_text(self, text, voices):
+        """根据大纲或未分角色的文本，按参与音色的平均语速预测时长（秒）"""
+        return count_chars(text) / self._average_chars_per_second(voices)
+
+    def target_chars(self, target_minutes, voices):
+        """目标时长（分钟）对应的脚本字数，用于引导 LLM 控制篇幅"""
+        return int(round(target_minutes * 60 * self._average_chars_per_second(voices)))
+
+    def estimate_eta(self, segment_latencies, workers=1):
+        """
+        估算在给定并发数下全部音频生成完成所需的时间（秒）
+
+        按最长处理时间优先的方式把各段分配给空闲的 worker
+        """
+        workers = max(1, int(workers))
+        loads = [0.0] * workers
+        for latency in sorted(segment_latencies, reverse=True):
+            loads[loads.index(min(loads))] += latency
+        return max(loads)
+
+    def suggest_workers(self, segment_latencies, deadline_seconds=30, max_workers=8):
+        """
+        估算在截止时间内完成合成所需的最少并发数
+
+        并发数不超过 max_workers 和段数；无法满足截止时间时，
+        返回能达到最短可实现耗时的最少并发数
+        """
+        if not segment_latencies:
+            return 1
+        upper = max(1, min(max_workers, len(segment_latencies)))
+        best_eta = self.estimate_eta(segment_latencies, upper)
+        target = max(deadline_seconds, best_eta)
+        for workers in range(1, upper + 1):
+            if self.estimate_eta(segment_latencies, workers) <= target + 1e-9:
+                return workers
+        return upper
+
+
+def format_seconds(seconds):
+    """将秒数格式化为 “X分Y秒”"""
+    seconds = int(round(seconds))
+    minutes, seconds = divmod(seconds, 60)
+    if minutes:
+        return f"{minutes}分{seconds}秒"
+    return f"{seconds}秒"
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""生成历史：基于 SQLite 的任务记录，对主题和脚本建立全文索引"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    topic TEXT NOT NULL,
+    script TEXT NOT NULL,
+    characters TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    target_minutes REAL,
+    script_seconds REAL,
+    synthesis_seconds REAL,
+    duration REAL,
+    audio_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at DESC);
+"""
+
+# trigram 分词器支持中文子串匹配（需要 SQLite >= 3.34）
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+    topic, script, content='jobs', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS jobs_ai AFTER INSERT ON jobs BEGIN
+    INSERT INTO jobs_fts (rowid, topic, script) VALUES (new.id, new.topic, new.script);
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_ad AFTER DELETE ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, topic, script) VALUES ('delete', old.id, old.topic, old.script);
+END;
+-- 只在主题或脚本变化时重建索引，更新音频信息（重新合成）不会重新分词
+DROP TRIGGER IF EXISTS jobs_au;
+CREATE TRIGGER jobs_au AFTER UPDATE OF topic, script ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, topic, script) VALUES ('delete', old.id, old.topic, old.script);
+    INSERT INTO jobs_fts (rowid, topic, script) VALUES (new.id, new.topic, new.script);
+END;
+"""
+
+_COLUMNS = ("id, created_at, topic, script, characters, scenario, target_minutes, "
+            "script_seconds, synthesis_seconds, duration, audio_path")
+
+
+class HistoryStore:
+    def __init__(self, db_file=os.path.join("data", "history.db")):
+        """
+        初始化历史记录数据库
+
+        参数:
+        db_file (str): SQLite 数据库文件路径
+        """
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # Gradio 在线程池中处理请求，连接在线程间共享，由 _lock 串行化访问
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        fts_existed = self._table_exists("jobs_fts")
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            print(f"警告: 当前 SQLite 不支持 FTS5 trigram 分词，搜索退化为 LIKE 匹配: {e}")
+            self.fts_enabled = False
+        if self.fts_enabled and not fts_existed:
+            # 索引表新建时补录已有记录（例如之前在不支持 FTS5 的环境中写入的任务）
+            with self._conn:
+                self._conn.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+
+    def _table_exists(self, name):
+        row = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def _migrate(self):
+        """升级旧版数据库结构"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "audio_seconds" in columns:
+            # 旧版用 audio_seconds 表示合成耗时，与 DurationModel 中表示音频时长的同名参数混淆
+            with self._conn:
+                self._conn.execute("ALTER TABLE jobs RENAME COLUMN audio_seconds TO synthesis_seconds")
+
+    def close(self):
+        self._conn.close()
+
+    def _row_to_dict(self, row):
+        job = dict(row)
+        job["characters"] = json.loads(job["characters"])
+        return job
+
+    def add_job(self, topic, script, characters, scenario, audio_path=None, target_minutes=None,
+                script_seconds=None, synthesis_seconds=None, duration=None):
+        """
+        记录一次生成任务
+
+        参数:
+        topic (str): 播客主题或文本内容
+        script (str): 生成的脚本
+        characters (dict): 角色名到人设的映射（含音色）
+        scenario (str): 场景模式
+        audio_path (str): 生成的音频文件路径
+        target_minutes (float): 目标时长（分钟）
+        script_seconds (float): 脚本生成耗时（秒）
+        synthesis_seconds (float): 音频合成耗时（秒）
+        duration (float): 音频时长（秒）
+
+        返回:
+        int: 任务 id
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (created_at, topic, script, characters, scenario, target_minutes, "
+                "script_seconds, synthesis_seconds, duration, audio_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), topic, script, json.dumps(characters, ensure_ascii=False), scenario,
+                 target_minutes, script_seconds, synthesis_seconds, duration, audio_path),
+            )
+            return cursor.lastrowid
+
+    def update_audio(self, job_id, audio_path, synthesis_seconds=None, duration=None):
+        """重新合成后更新任务的音频信息"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET audio_path = ?, synthesis_seconds = ?, duration = ? WHERE id = ?",
+                (audio_path, synthesis_seconds, duration, job_id),
+            )
+
+    def get(self, job_id):
+        """按 id 查询任务，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def delete(self, job_id):
+        """删除任务记录（不删除音频文件），全文索引由触发器同步"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def search(self, query="", page=1, page_size=10):
+        """
+        分页查询历史任务，按创建时间倒序
+
+        参数:
+        query (str): 在主题和脚本中搜索的关键词，为空时返回全部
+        page (int): 页码，从 1 开始
+        page_size (int): 每页条数
+
+        返回:
+        tuple: (当前页任务列表, 匹配总数)
+        """
+        page = max(1, int(page))
+        offset = (page - 1) * page_size
+        query = (query or "").strip()
+
+        if not query:
+            where, params = "", ()
+        elif self.fts_enabled and len(query) >= 3:
+            # trigram 分词要求至少3个字符；用双引号包裹按短语匹配，避免特殊字符被解析为 FTS 语法
+            phrase = '"' + query.replace('"', '""') + '"'
+            where = "WHERE id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ?)"
+            params = (phrase,)
+        else:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where = "WHERE topic LIKE ? ESCAPE '\\' OR script LIKE ? ESCAPE '\\'"
+            params = (pattern, pattern)
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM jobs {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs {where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + (page_size, offset),
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows], total
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""角色人设与音色注册表，支持零样本克隆音色的一次性注册和缓存"""
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import urllib.request
+
+# 预设角色：人设信息 + 对应的 CosyVoice 音色
+DEFAULT_PERSONAS = {
+    "小付": {
+        "gender": "女",
+        "identity": "专业播客主持人",
+        "personality": "亲和力强，善于引导话题，语言表达清晰",
+        "voice_style": "吐字清晰、标准，适合知识传播",
+        "voice": "longanwen",
+    },
+    "小陈": {
+        "gender": "男",
+        "identity": "计算机技术专家",
+        "personality": "善于化繁为简，讲解细致，乐于授业",
+        "voice_style": "语速平稳、表达精准，适合技术讲解",
+        "voice": "longanshuo",
+    },
+    "Mike": {
+        "gender": "男",
+        "identity": "学者",
+        "personality": "学识广博，叙事生动，富有学养",
+        "voice_style": "语调温和亲切，娓娓道来，富有故事感",
+        "voice": "longanzhi",
+    },
+    "Lily": {
+        "gender": "女",
+        "identity": "医生",
+        "personality": "专业权威，严谨负责，心系大众健康",
+        "voice_style": "语气温柔，语调稳定，给人以信赖感",
+        "voice": "longanrou",
+    },
+    "Helen": {
+        "gender": "女",
+        "identity": "生活方式分享者",
+        "personality": "极富亲和力，贴近日常，共情力强",
+        "voice_style": "声音活泼生动，富有朝气与感染力",
+        "voice": "longhua_v2",
+    },
+}
+
+
+# 脚本按 <(\w+)>...</\1> 解析，角色名只能由字母、数字、下划线和汉字组成
+_NAME_PATTERN = re.compile(r'^\w+$')
+
+
+def is_valid_name(name):
+    """角色名是否能被脚本解析（只能包含字母、数字、下划线或汉字）"""
+    return bool(name) and _NAME_PATTERN.match(name) is not None
+
+
+def hash_sample(sample_path):
+    """计算音频样本的 sha256，用作克隆音色的缓存键"""
+    digest = hashlib.sha256()
+    with open(sample_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VoiceRegistry:
+    def __init__(self, registry_file=os.path.join("data", "voice_registry.json"),
+                 target_model="cosyvoice-v2"):
+        """
+        初始化注册表，加载预设角色以及之前注册过的自定义角色和克隆音色
+
+        参数:
+        registry_file (str): 自定义角色和克隆音色缓存的持久化文件，为 None 时只保存在内存中
+        target_model (str): 克隆音色所使用的语音合成模型
+        """
+        self.registry_file = registry_file
+        self.target_model = target_model
+        self._lock = threading.Lock()
+        self._personas = copy.deepcopy(DEFAULT_PERSONAS)
+        self._custom = set()
+        # "模型:样本哈希" -> 克隆得到的 voice_id
+        self._enrolled = {}
+        self._load()
+
+    def _load(self):
+        if not self.registry_file or not os.path.exists(self.registry_file):
+            return
+        try:
+            with open(self.registry_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"警告: 读取音色注册表 {self.registry_file} 失败: {e}")
+            return
+        for key, voice_id in data.get("enrolled", {}).items():
+            # 兼容旧版 "模型:样本哈希:样本地址" 格式的缓存键
+            self._enrolled[":".join(key.split(":", 2)[:2])] = voice_id
+        for name, persona in data.get("personas", {}).items():
+            self._personas[name] = persona
+            self._custom.add(name)
+
+    def save(self):
+        """将自定义角色和克隆音色缓存写入文件"""
+        if not self.registry_file:
+            return
+        directory = os.path.dirname(self.registry_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 写入和替换都在锁内完成，避免并发任务交错写同一个临时文件
+        with self._lock:
+            data = {
+                "personas": {name: self._personas[name] for name in self._custom},
+                "enrolled": dict(self._enrolled),
+            }
+            temp_file = self.registry_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.registry_file)
+
+    def names(self):
+        """所有已注册的角色名"""
+        return list(self._personas.keys())
+
+    def persona(self, name):
+        """返回角色人设（不含音色字段），用于构造 LLM 提示词"""
+        persona = self._personas.get(name)
+        if persona is None:
+            return None
+        return {k: v for k, v in persona.items() if k != "voice"}
+
+    def personas(self):
+        """所有角色人设（不含音色字段）"""
+        return {name: self.persona(name) for name in self._personas}
+
+    def voice_for(self, name):
+        """角色对应的音色，未注册时返回 None"""
+        persona = self._personas.get(name)
+        return persona.get("voice") if persona else None
+
+    def voice_map(self):
+        """角色名到音色的映射"""
+        return {name: persona["voice"] for name, persona in self._personas.items() if persona.get("voice")}
+
+    def register(self, name, persona, voice):
+        """
+        注册或更新一个使用现有音色的角色
+
+        参数:
+        name (str): 角色名，需与脚本中的 <角色名> 标签一致
+        persona (dict): 人设信息（gender、identity、personality、voice_style）
+        voice (str): 音色名或克隆得到的 voice_id
+        """
+        if not is_valid_name(name):
+            raise ValueError(f"角色名 '{name}' 无效，只能包含字母、数字、下划线或汉字")
+        entry = dict(persona)
+        entry["voice"] = voice
+        with self._lock:
+            self._personas[name] = entry
+            self._custom.add(name)
+        self.save()
+
+    def enroll_voice(self, sample_path, sample_url, prefix="listenpub"):
+        """
+        通过零样本克隆注册音色。同一模型、同一样本只会注册一次（与样本地址无关），之后直接返回缓存的 voice_id
+
+        克隆服务只能从公网地址获取音频，因此 sample_url 必须指向与 sample_path 内容相同的文件；
+        首次注册前会下载 sample_url 校验两者的哈希，不一致时拒绝注册
+
+        参数:
+        sample_path (str): 本地音频样本路径，用于计算缓存键
+        sample_url (str): 可公网访问的样本地址，内容需与 sample_path 相同
+        prefix (str): 音色名前缀（仅限数字和小写字母，少于10个字符）
+
+        返回:
+        str: 克隆音色的 voice_id
+        """
+        if not sample_url or not sample_url.startswith(("http://", "https://")):
+            raise ValueError("音色克隆需要提供可公网访问的样本地址（http/https）")
+        sample_hash = hash_sample(sample_path)
+        cache_key = f"{self.target_model}:{sample_hash}"
+        voice_id = self._enrolled.get(cache_key)
+        if voice_id:
+            return voice_id
+
+        # 校验样本地址的内容与本地样本一致，避免把其他音频的克隆结果缓存到该样本下
+        digest = hashlib.sha256()
+        with urllib.request.urlopen(sample_url, timeout=30) as response:
+            for chunk in iter(lambda: response.read(1 << 16), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != sample_hash:
+            raise ValueError("样本地址的音频内容与上传的样本不一致")
+
+        from src.audio_engine import _load_dashscope
+        from dashscope.audio.tts_v2 import VoiceEnrollmentService
+
+        _load_dashscope()
+        service = VoiceEnrollmentService()
+        voice_id = service.create_voice(
+            target_model=self.target_model,
+            prefix=prefix,
+            url=sample_url,
+        )
+        print(f"音色克隆完成: {voice_id}")
+        with self._lock:
+            self._enrolled[cache_key] = voice_id
+        self.save()
+        return voice_id
+
+    def register_cloned(self, name, persona, sample_path, sample_url, prefix="listenpub"):
+        """注册一个使用克隆音色的自定义角色，返回 voice_id"""
+        if not is_valid_name(name):
+            raise ValueError(f"角色名 '{name}' 无效，只能包含字母、数字、下划线或汉字")
+        voice_id = self.enroll_voice(sample_path, sample_url, prefix)
+        self.register(name, persona, voice_id)
+        return voice_id
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from src.duration_model import (
+    DEFAULT_CHARS_PER_SECOND,
+    DEFAULT_LATENCY_OVERHEAD,
+    DEFAULT_LATENCY_PER_CHAR,
+    DurationModel,
+    count_chars,
+    format_seconds,
+)
+
+
+@pytest.fixture
+def model():
+    return DurationModel(stats_file=None)
+
+
+def test_count_chars_ignores_whitespace_and_punctuation():
+    assert count_chars("你好，世界！ Hello, world.") == 14
+
+
+def test_defaults_without_samples(model):
+    assert model.chars_per_second("unknown") == DEFAULT_CHARS_PER_SECOND
+    assert model._latency("unknown", 100) == pytest.approx(
+        DEFAULT_LATENCY_OVERHEAD + DEFAULT_LATENCY_PER_CHAR * 100
+    )
+
+
+def test_chars_per_second_is_ratio_of_sums(model):
+    model.record("v", "字" * 100, 20, 3)
+    model.record("v", "字" * 50, 5, 1)
+    assert model.chars_per_second("v") == pytest.approx(150 / 25)
+
+
+def test_least_squares_fit_recovers_linear_latency(model):
+    for chars in (10, 50, 100, 200):
+        model.record("v", "字" * chars, chars / 4.0, 0.5 + 0.01 * chars)
+    overhead, per_char = model._stats["v"].latency_coefficients()
+    assert overhead == pytest.approx(0.5)
+    assert per_char == pytest.approx(0.01)
+
+
+def test_single_sample_keeps_overhead(model):
+    # 一个 5 字、耗时 2 秒的样本主要是固定耗时，不应把全部耗时算成每字耗时
+    model.record("v", "你好世界啊", 1.2, 2)
+    overhead, per_char = model._stats["v"].latency_coefficients()
+    assert overhead > DEFAULT_LATENCY_OVERHEAD
+    assert model._latency("v", 100) < 6
+
+
+def test_negative_fit_falls_back_to_scaled_defaults(model):
+    # 字数越多耗时反而越短，拟合出负的每字耗时
+    model.record("v", "字" * 10, 2, 3.0)
+    model.record("v", "字" * 50, 10, 2.0)
+    model.record("v", "字" * 100, 20, 1.0)
+    overhead, per_char = model._stats["v"].latency_coefficients()
+    assert overhead > 0 and per_char > 0
+    assert overhead / per_char == pytest.approx(DEFAULT_LATENCY_OVERHEAD / DEFAULT_LATENCY_PER_CHAR)
+
+
+def test_estimate_script_skips_unknown_characters(model):
+    script = "<a>你好世界</a>\n<b>再见</b>\n<c>未注册</c>"
+    estimate = model.estimate_script(script, {"a": "v1", "b": "v2"})
+    assert len(estimate["segment_latencies"]) == 2
+    assert estimate["duration"] == pytest.approx(6 / DEFAULT_CHARS_PER_SECOND)
+    assert estimate["latency"] == pytest.approx(sum(estimate["segment_latencies"]))
+
+
+def test_target_chars_uses_average_speed(model):
+    assert model.target_chars(5, []) == round(5 * 60 * DEFAULT_CHARS_PER_SECOND)
+
+
+@pytest.mark.parametrize("latencies, workers, expected", [
+    ([], 3, 0.0),
+    ([5, 4, 3, 3, 3], 1, 18),
+    ([5, 4, 3, 3, 3], 2, 10),
+    ([10, 1, 1], 8, 10),
+])
+def test_estimate_eta_greedy_schedule(model, latencies, workers, expected):
+    assert model.estimate_eta(latencies, workers) == pytest.approx(expected)
+
+
+def test_suggest_workers_meets_deadline_with_fewest_workers(model):
+    assert model.suggest_workers([10] * 10, deadline_seconds=30, max_workers=8) == 4
+
+
+def test_suggest_workers_caps_at_segment_count(model):
+    assert model.suggest_workers([40, 40], deadline_seconds=30, max_workers=8) == 2
+
+
+def test_suggest_workers_returns_fewest_reaching_best_eta(model):
+    # 截止时间无法满足时，最短耗时由最长的一段决定，2 个并发即可达到
+    assert model.suggest_workers([50, 10, 10, 10], deadline_seconds=30, max_workers=8) == 2
+
+
+def test_suggest_workers_respects_max_workers(model):
+    assert model.suggest_workers([10] * 20, deadline_seconds=5, max_workers=3) == 3
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    stats_file = tmp_path / "stats" / "voice_stats.json"
+    model = DurationModel(stats_file=str(stats_file))
+    model.record("v", "字" * 90, 20, 3)
+    model.save()
+    assert json.loads(stats_file.read_text(encoding="utf-8"))["v"]["samples"] == 1
+    assert DurationModel(stats_file=str(stats_file)).chars_per_second("v") == pytest.approx(4.5)
+
+
+def test_format_seconds():
+    assert format_seconds(42.4) == "42秒"
+    assert format_seconds(125) == "2分5秒"
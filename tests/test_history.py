@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+import pytest
+
+from src.history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def add(store, topic, script="<小付>内容</小付>"):
+    return store.add_job(topic=topic, script=script, characters={"小付": {"voice": "longanwen"}},
+                         scenario="深度访谈")
+
+
+def test_add_and_get_roundtrip(store):
+    job_id = store.add_job(topic="云原生", script="<小付>你好</小付>",
+                           characters={"小付": {"voice": "longanwen"}}, scenario="深度访谈",
+                           audio_path="a.mp3", target_minutes=5, script_seconds=1.5,
+                           synthesis_seconds=8.0, duration=300)
+    job = store.get(job_id)
+    assert job["characters"] == {"小付": {"voice": "longanwen"}}
+    assert job["synthesis_seconds"] == 8.0
+    assert job["duration"] == 300
+    assert store.get(job_id + 1) is None
+
+
+def test_search_pagination_newest_first(store):
+    ids = [add(store, f"主题{i}") for i in range(25)]
+    jobs, total = store.search(page=1, page_size=10)
+    assert total == 25
+    assert [job["id"] for job in jobs] == ids[::-1][:10]
+    jobs, _ = store.search(page=3, page_size=10)
+    assert [job["id"] for job in jobs] == ids[::-1][20:]
+    assert store.search(page=4, page_size=10) == ([], 25)
+
+
+def test_fts_search_matches_topic_and_script(store):
+    assert store.fts_enabled
+    add(store, "云原生技术入门")
+    add(store, "其他", script="<小陈>今天聊聊云原生技术</小陈>")
+    add(store, "大模型应用")
+    jobs, total = store.search("云原生技术")
+    assert total == 2
+    assert store.search("大模型应用")[1] == 1
+
+
+def test_short_query_uses_like(store):
+    add(store, "大模型")
+    add(store, "小模型")
+    # trigram 索引无法匹配少于 3 个字符的查询，退化为 LIKE
+    assert store.search("模型")[1] == 2
+
+
+def test_like_escapes_wildcards(store):
+    add(store, "增长50%")
+    add(store, "增长500")
+    add(store, "a_b")
+    add(store, "axb")
+    assert store.search("0%")[1] == 1
+    assert store.search("_b")[1] == 1
+
+
+def test_fts_phrase_escapes_quotes_and_operators(store):
+    add(store, '他说"你好" AND OR')
+    assert store.search('"你好"')[1] == 1
+    assert store.search("AND OR")[1] == 1
+
+
+def test_fts_follows_updates_and_deletes(store):
+    job_id = add(store, "云原生技术")
+    store.update_audio(job_id, "b.mp3", 3.0, 60)
+    assert store.search("云原生技术")[1] == 1
+    assert store.get(job_id)["audio_path"] == "b.mp3"
+    store.delete(job_id)
+    assert store.search("云原生技术")[1] == 0
+    assert store.get(job_id) is None
+
+
+def test_fts_backfills_existing_rows(tmp_path):
+    db_file = str(tmp_path / "history.db")
+    store = HistoryStore(db_file)
+    add(store, "云原生技术")
+    store.close()
+
+    # 模拟在不支持 FTS5 的环境中写入的记录：删除索引表和触发器后再插入
+    conn = sqlite3.connect(db_file)
+    conn.executescript("DROP TRIGGER jobs_ai; DROP TRIGGER jobs_ad; DROP TRIGGER jobs_au; DROP TABLE jobs_fts;")
+    conn.execute("INSERT INTO jobs (created_at, topic, script, characters, scenario) "
+                 "VALUES (0, '大模型应用', '', '{}', '深度访谈')")
+    conn.commit()
+    conn.close()
+
+    store = HistoryStore(db_file)
+    assert store.search("云原生技术")[1] == 1
+    assert store.search("大模型应用")[1] == 1
+    store.close()
+
+
+def test_migrates_audio_seconds_column(tmp_path):
+    db_file = str(tmp_path / "history.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+                 "topic TEXT NOT NULL, script TEXT NOT NULL, characters TEXT NOT NULL, scenario TEXT NOT NULL, "
+                 "target_minutes REAL, script_seconds REAL, audio_seconds REAL, duration REAL, audio_path TEXT)")
+    conn.execute("INSERT INTO jobs (created_at, topic, script, characters, scenario, audio_seconds) "
+                 "VALUES (0, 't', '', '{}', 's', 7.5)")
+    conn.commit()
+    conn.close()
+
+    store = HistoryStore(db_file)
+    assert store.get(1)["synthesis_seconds"] == 7.5
+    store.close()
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""ListenPub 轻量级 worker / 命令行入口，不依赖 Gradio
+
+示例:
+    python worker.py "云原生" --characters 小付 小陈 --scenario 深度访谈 --minutes 5
+    python worker.py --jobs jobs.jsonl      # 每行一个 JSON 任务，"-" 表示从标准输入读取
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from src.duration_model import DurationModel, format_seconds
+from src.dialogue_engine import DEFAULT_SCENARIOS, PodcastScriptGenerator, PromptTemplate
+from src.voice_registry import VoiceRegistry
+
+
+class PodcastWorker:
+    def __init__(self, audio_dir=os.path.join("data", "audio"), record_history=True,
+                 deadline_seconds=30, max_workers=8):
+        """
+        启动时加载角色注册表、时长模型并预编译提示词模板，之后每个任务只做必要的计算
+
+        参数:
+        audio_dir (str): 生成音频的保存目录
+        record_history (bool): 是否将任务写入生成历史
+        deadline_seconds (float): 音频合成的目标耗时（秒），用于估算并发数
+        max_workers (int): 单个任务的最大合成并发数
+        """
+        self.audio_dir = audio_dir
+        self.deadline_seconds = deadline_seconds
+        self.max_workers = max_workers
+        self.voice_registry = VoiceRegistry()
+        self.duration_model = DurationModel()
+        self.prompt_template = PromptTemplate(self.voice_registry.personas(), DEFAULT_SCENARIOS)
+        self.history = None
+        if record_history:
+            from src.history import HistoryStore
+
+            self.history = HistoryStore()
+
+    def run_job(self, topic, characters, scenario, target_minutes=5, output_file=None, script_only=False):
+        """
+        执行一次播客生成任务
+
+        参数:
+        topic (str): 播客主题或文本内容
+        characters (list): 参与的角色名列表
+        scenario (str): 场景模式
+        target_minutes (float): 目标时长（分钟）
+        output_file (str): 输出音频路径，为 None 时在 audio_dir 下自动命名
+        script_only (bool): 只生成脚本，不合成音频
+
+        返回:
+        dict: 任务结果，包含脚本、预计时长和耗时、音频路径等
+        """
+        if not topic.strip():
+            raise ValueError("播客主题或文本内容不能为空")
+        if scenario not in DEFAULT_SCENARIOS:
+            raise ValueError(f"未知的场景模式: {scenario}")
+        characters_data = {}
+        for name in characters:
+            persona = self.voice_registry.persona(name)
+            if persona is None:
+                raise ValueError(f"未知的角色: {name}")
+            characters_data[name] = persona
+
+        voice_map = self.voice_registry.voice_map()
+        voices = [voice_map[name] for name in characters_data if name in voice_map]
+        target_chars = self.duration_model.target_chars(target_minutes, voices)
+        # 调用 LLM 之前，先根据输入内容给出粗略估计
+        input_duration = self.duration_model.estimate_text(topic, voices)
+        print(f"输入内容朗读约 {format_seconds(input_duration)}，"
+              f"目标时长 {target_minutes} 分钟（约 {target_chars} 字）", file=sys.stderr)
+
+        script_start = time.perf_counter()
+        script = PodcastScriptGenerator(
+            topic=topic.strip(),
+            characters=characters_data,
+            scenario={scenario: DEFAULT_SCENARIOS[scenario]},
+            target_minutes=target_minutes,
+            target_chars=target_chars,
+            template=self.prompt_template,
+        ).generate_script()
+        script_seconds = time.perf_counter() - script_start
+
+        estimate = self.duration_model.estimate_script(script, voice_map)
+        if not estimate["segment_latencies"]:
+            raise ValueError("生成的脚本中没有可合成的 <角色名>对话</角色名> 段落")
+        workers = self.duration_model.suggest_workers(
+            estimate["segment_latencies"], self.deadline_seconds, self.max_workers
+        )
+        result = {
+            "topic": topic.strip(),
+            "script": script,
+            "script_seconds": script_seconds,
+            "estimated_input_duration": input_duration,
+            "estimated_duration": estimate["duration"],
+            "estimated_latency": estimate["latency"],
+            "workers": workers,
+            "estimated_eta": self.duration_model.estimate_eta(estimate["segment_latencies"], workers),
+        }
+        print(f"预计时长: {format_seconds(result['estimated_duration'])}，"
+              f"预计合成耗时: {format_seconds(result['estimated_eta'])}（并发数 {workers}）", file=sys.stderr)
+        if script_only:
+            return result
+
+        # 只有需要合成音频时才加载语音合成后端
+        from src.audio_engine import AudioGenerator
+
+        if output_file is None:
+            os.makedirs(self.audio_dir, exist_ok=True)
+            output_file = os.path.join(self.audio_dir, f"podcast_{datetime.now():%Y%m%d_%H%M%S_%f}.mp3")
+        audio_start = time.perf_counter()
+        audio_generator = AudioGenerator(duration_model=self.duration_model, voice_registry=self.voice_registry)
+        output_file = audio_generator.batch_generate_audio(script, output_file, workers=workers)
+        result["synthesis_seconds"] = time.perf_counter() - audio_start
+        result["duration"] = audio_generator.last_duration
+        result["audio_path"] = output_file
+
+        if self.history is not None:
+            cast = {name: dict(data, voice=voice_map.get(name)) for name, data in characters_data.items()}
+            result["job_id"] = self.history.add_job(
+                topic=result["topic"],
+                script=script,
+                characters=cast,
+                scenario=scenario,
+                audio_path=output_file,
+                target_minutes=target_minutes,
+                script_seconds=script_seconds,
+                synthesis_seconds=result["synthesis_seconds"],
+                duration=result["duration"],
+            )
+        return result
+
+
+def _iter_jobs(path):
+    stream = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8')
+    try:
+        for line in stream:
+            line = line.strip()
+            # 逐行返回原始文本，由调用方在单个任务的异常处理中解析，坏行不会中断整个任务流
+            if line:
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ListenPub 播客生成 worker")
+    parser.add_argument("topic", nargs="?", help="播客主题或文本内容")
+    parser.add_argument("--characters", nargs="+", default=["小付", "小陈"], help="参与的角色名")
+    parser.add_argument("--scenario", default="深度访谈", choices=list(DEFAULT_SCENARIOS.keys()), help="场景模式")
+    parser.add_argument("--minutes", type=float, default=5, help="目标时长（分钟）")
+    parser.add_argument("--output", help="输出音频路径")
+    parser.add_argument("--script-only", action="store_true", help="只生成脚本，不合成音频")
+    parser.add_argument("--no-history", action="store_true", help="不写入生成历史")
+    parser.add_argument("--deadline", type=float, default=30, help="音频合成的目标耗时（秒），用于估算并发数")
+    parser.add_argument("--max-workers", type=int, default=8, help="单个任务的最大合成并发数")
+    parser.add_argument("--jobs", help="JSON Lines 任务文件，'-' 表示从标准输入读取")
+    args = parser.parse_args(argv)
+
+    if not args.topic and not args.jobs:
+        parser.error("需要提供 topic 或 --jobs")
+
+    with contextlib.redirect_stdout(sys.stderr):
+        worker = PodcastWorker(record_history=not args.no_history, deadline_seconds=args.deadline,
+                               max_workers=args.max_workers)
+
+    if args.jobs:
+        jobs = _iter_jobs(args.jobs)
+    else:
+        jobs = [{
+            "topic": args.topic,
+            "characters": args.characters,
+            "scenario": args.scenario,
+            "target_minutes": args.minutes,
+            "output_file": args.output,
+        }]
+
+    exit_code = 0
+    for job in jobs:
+        try:
+            if isinstance(job, str):
+                job = json.loads(job)
+                if not isinstance(job, dict):
+                    raise ValueError(f"任务必须是 JSON 对象，实际为 {type(job).__name__}")
+            job.setdefault("characters", args.characters)
+            job.setdefault("scenario", args.scenario)
+            job.setdefault("target_minutes", args.minutes)
+            job.setdefault("script_only", args.script_only)
+            # 标准输出只保留每个任务一行 JSON 结果，任务执行中的日志输出转到标准错误
+            with contextlib.redirect_stdout(sys.stderr):
+                result = worker.run_job(**job)
+        except Exception as e:
+            result = {"topic": job.get("topic") if isinstance(job, dict) else None, "error": str(e)}
+            exit_code = 1
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())